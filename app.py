@@ -10,7 +10,9 @@ import sqlite3
 import uuid
 from datetime import datetime
 import json
+import hashlib
 from db import init_db # Import the database initialization script
+from video import VIDEO_TYPES, is_video_file, extract_video_frames, format_video_time
 
 # Initialize database
 conn = init_db()
@@ -37,6 +39,16 @@ if "session_loaded_from_url" not in st.session_state:
     st.session_state.session_loaded_from_url = False
 if "processed_files" not in st.session_state:
     st.session_state.processed_files = set()
+if "MAX_MATCHES" not in st.session_state:
+    st.session_state.MAX_MATCHES = 0 # 0 = search every photo
+if "search_stats" not in st.session_state:
+    st.session_state.search_stats = None
+if "stopped_capture" not in st.session_state:
+    st.session_state.stopped_capture = None
+if "results_saved" not in st.session_state:
+    st.session_state.results_saved = False
+if "save_errors" not in st.session_state:
+    st.session_state.save_errors = []
 
 
 st.set_page_config(page_title="Face Finder: Camera Detection", layout="wide")
@@ -46,7 +58,7 @@ st.markdown("---")
 # ---------------- HELPER FUNCTIONS ----------------
 
 def save_photos_to_db(session_id, uploaded_files):
-    """Save uploaded photos to database"""
+    """Save uploaded photos to database (videos are stored as their sampled frames)"""
     c = conn.cursor()
     
     # Create session entry
@@ -55,8 +67,30 @@ def save_photos_to_db(session_id, uploaded_files):
         (session_id, datetime.now(), st.session_state.MATCH_THRESHOLD)
     )
     
+    saved_count = 0
     # Save each photo
     for file in uploaded_files:
+        if is_video_file(file.name):
+            # Each kept frame becomes a searchable photo linked back to its time offset.
+            # A savepoint lets a clip that fails partway be dropped without its frames.
+            c.execute("SAVEPOINT video_import")
+            video_count = 0
+            try:
+                for frame_name, frame_bytes, seconds in extract_video_frames(file):
+                    c.execute(
+                        "INSERT INTO photos (session_id, filename, file_data, uploaded_at, source_video, video_time) VALUES (?, ?, ?, ?, ?, ?)",
+                        (session_id, frame_name, sqlite3.Binary(frame_bytes), datetime.now(), file.name, seconds)
+                    )
+                    video_count += 1
+            except Exception as e:
+                c.execute("ROLLBACK TO video_import")
+                # Kept in session state so the message survives the rerun after saving
+                st.session_state.save_errors.append(f"Skipped {file.name}: {str(e)}")
+            else:
+                saved_count += video_count
+            c.execute("RELEASE video_import")
+            continue
+
         # Reset file pointer to the beginning for reading
         file.seek(0)
         file_bytes = file.getvalue()
@@ -64,22 +98,26 @@ def save_photos_to_db(session_id, uploaded_files):
             "INSERT INTO photos (session_id, filename, file_data, uploaded_at) VALUES (?, ?, ?, ?)",
             (session_id, file.name, sqlite3.Binary(file_bytes), datetime.now())
         )
+        saved_count += 1
     
     conn.commit()
-    return len(uploaded_files)
+    return saved_count
 
 def get_photos_from_db(session_id):
     """Retrieve photos from database for a session"""
     c = conn.cursor()
     c.execute(
-        "SELECT filename, file_data FROM photos WHERE session_id = ?",
+        "SELECT filename, file_data, source_video, video_time FROM photos WHERE session_id = ?",
         (session_id,)
     )
     photos = []
-    for filename, file_data in c.fetchall():
+    for filename, file_data, source_video, video_time in c.fetchall():
         # Create a file-like object from bytes
         file_obj = BytesIO(file_data)
         file_obj.name = filename
+        # Set for frames sampled from a video, None for regular photos
+        file_obj.source_video = source_video
+        file_obj.video_time = video_time
         photos.append(file_obj)
     return photos
 
@@ -93,89 +131,180 @@ def save_match_to_db(session_id, target_face_data, target_name, matched_filename
     conn.commit()
 
 # --- OPTIMIZED FUNCTION: IMAGE RESIZING APPLIED ---
-def find_matching_photos(target_encoding, comparison_files):
-    """Find the target face in the photos (optimized with resizing for speed)"""
+def iter_matching_photos(target_encoding, comparison_files, on_progress=None):
+    """Yield matches for the target face one at a time (optimized with resizing for speed)"""
 
-    matched_files = []
     if not comparison_files:
-        return matched_files
+        return
 
-    new_files = comparison_files
-    
-    if not new_files:
-        st.info("All photos already checked.")
-        return matched_files
-
-    start_time = time.time() # Start time measurement
-    
-    progress_bar = st.progress(0)
-    status_text = st.empty()
     current_threshold = st.session_state.MATCH_THRESHOLD
 
-    status_text.text(f"Checking {len(new_files)} photos (Threshold: {current_threshold})...")
-
     # Reset processed_files for a fresh search run
     st.session_state.processed_files = set()
-    
+
     # Optimization Factor: Resizing by 4 reduces processing area by 16x (4*4)
     # Higher factor = faster, but less accurate for very small/distant faces
-    RESIZE_FACTOR = 4 
+    RESIZE_FACTOR = 4
 
-    for i, file in enumerate(new_files):
+    for i, file in enumerate(comparison_files):
         try:
             file.seek(0)
-            
+
             # 1. PIL Image में लोड करें
             pil_image = Image.open(file).convert("RGB")
-            
+
             # 2. Resizing: इमेज को छोटा करें
             small_image = pil_image.resize(
                 (pil_image.width // RESIZE_FACTOR, pil_image.height // RESIZE_FACTOR)
             )
-            
+
             # 3. face_recognition के लिए numpy array में बदलें
-            image_np = np.array(small_image) 
+            image_np = np.array(small_image)
 
             # Detect faces using the smaller image
             face_locations = face_recognition.face_locations(image_np, model="hog")
             # Note: face_encodings automatically handles the smaller size
             face_encodings = face_recognition.face_encodings(image_np, face_locations)
 
-            if not face_encodings:
-                st.session_state.processed_files.add(file.name)
-                continue
+            st.session_state.processed_files.add(file.name)
+            match = None
 
             # Check each detected face against the target face
-            for face_encoding in face_encodings:
-                distance = face_recognition.face_distance(
-                    [target_encoding], face_encoding
-                )[0]
-
-                if distance <= current_threshold:
-                    matched_files.append({
+            if face_encodings:
+                distances = face_recognition.face_distance(face_encodings, target_encoding)
+                if (distances <= current_threshold).any():
+                    match = {
                         "file": file,
                         "filename": file.name,
-                        "faces_detected": len(face_encodings)
-                    })
-                    break 
-
-            st.session_state.processed_files.add(file.name)
+                        "faces_detected": len(face_encodings),
+                        "source_video": getattr(file, "source_video", None),
+                        "video_time": getattr(file, "video_time", None)
+                    }
 
         except Exception as e:
             st.warning(f"Error processing {file.name}: {str(e)}")
+            match = None
+
+        if on_progress is not None:
+            on_progress(i + 1, len(comparison_files))
+
+        if match is not None:
+            yield match
+
+
+def find_matching_photos(target_encoding, comparison_files, max_matches=0):
+    """Run the search, rendering each match into the grid as soon as it is found"""
+
+    matched_files = []
+    st.session_state.matched_photos = matched_files
+    st.session_state.search_stats = None
+    st.session_state.results_saved = False
+    if not comparison_files:
+        return matched_files
+
+    start_time = time.time() # Start time measurement
+    search_stats = {
+        "checked": 0,
+        "total": len(comparison_files),
+        "time_to_first_match": None,
+        "total_time": None,
+        "stopped_early": False,
+        "started_at": start_time,
+    }
+    st.session_state.search_stats = search_stats
+
+    progress_bar = st.progress(0)
+    status_text = st.empty()
+    current_threshold = st.session_state.MATCH_THRESHOLD
+
+    status_text.text(f"Checking {len(comparison_files)} photos (Threshold: {current_threshold})...")
+
+    # Live grid: filled while the search runs, cleared once section 5 takes over
+    live_results = st.empty()
+    live_grid = live_results.container()
+    count_text = live_grid.empty()
+    cols = live_grid.columns(3)
 
-        progress_bar.progress((i + 1) / len(new_files))
+    def update_progress(checked, total):
+        search_stats["checked"] = checked
+        progress_bar.progress(checked / total)
+
+    for match in iter_matching_photos(target_encoding, comparison_files, update_progress):
+        if search_stats["time_to_first_match"] is None:
+            search_stats["time_to_first_match"] = time.time() - start_time
+
+        # Stored in session state as we go, so a Stop rerun keeps partial results
+        matched_files.append(match)
+
+        with cols[(len(matched_files) - 1) % 3]:
+            match['file'].seek(0)
+            st.image(match['file'], use_column_width=True)
+            st.caption(f"**{match['filename']}**")
+            if match['video_time'] is not None:
+                st.caption(f"Video: {match['source_video']} at {format_video_time(match['video_time'])}")
+        count_text.markdown(
+            f"**{len(matched_files)} matches** so far "
+            f"({search_stats['checked']}/{search_stats['total']} photos checked)"
+        )
+
+        if max_matches and len(matched_files) >= max_matches:
+            search_stats["stopped_early"] = True
+            break
 
     end_time = time.time()
-    total_time = end_time - start_time
-    
+    search_stats["total_time"] = end_time - start_time
+
     progress_bar.empty()
     status_text.empty()
+    live_results.empty()
 
     return matched_files
 # --- END OPTIMIZED FUNCTION ---
 
 
+def stop_search(capture_key, target_face_data):
+    """Stop button callback: save the partial results and skip re-running this capture"""
+    search_stats = st.session_state.search_stats
+    if not search_stats or search_stats["total_time"] is not None:
+        return # Search already finished, nothing to stop
+
+    st.session_state.stopped_capture = capture_key
+    search_stats["total_time"] = time.time() - search_stats["started_at"]
+    search_stats["stopped_early"] = True
+
+    matched_photos = st.session_state.matched_photos
+    if matched_photos and not st.session_state.results_saved:
+        save_match_to_db(
+            st.session_state.current_session_id,
+            target_face_data,
+            st.session_state.target_person_name,
+            [match['filename'] for match in matched_photos]
+        )
+        st.session_state.results_saved = True
+
+
+def resume_search():
+    """Search Again button callback: clear the stopped state so the search re-runs"""
+    st.session_state.stopped_capture = None
+
+
+def show_search_timing(search_stats):
+    """Show time-to-first-match and total search time metrics"""
+    col1, col2 = st.columns(2)
+    
+    with col1:
+        if search_stats["time_to_first_match"] is not None:
+            st.metric("Time to First Match", f"{search_stats['time_to_first_match']:.1f}s")
+        else:
+            st.metric("Time to First Match", "-")
+    
+    with col2:
+        if search_stats["total_time"] is not None:
+            st.metric("Total Search Time", f"{search_stats['total_time']:.1f}s")
+        else:
+            st.metric("Total Search Time", "-")
+
+
 def create_zip_file(matched_photos):
     """Create a ZIP file of matched photos"""
     if not matched_photos:
@@ -213,6 +342,7 @@ with st.sidebar:
             st.session_state.session_loaded_from_url = False
             st.session_state.processed_files = set() # Reset processed files
             st.session_state.matched_photos = None # Reset results
+            st.session_state.stopped_capture = None # Allow a fresh search
             st.rerun()
     
     with col2:
@@ -227,6 +357,7 @@ with st.sidebar:
                 st.success(f"Loaded {len(photos)} photos from session")
                 st.session_state.shareable_link = generate_shareable_link(session_input)
                 st.session_state.matched_photos = None # Reset results
+                st.session_state.stopped_capture = None # Allow a fresh search
                 st.session_state.processed_files = set() # Reset processed files
                 st.rerun()
             else:
@@ -240,21 +371,23 @@ with st.sidebar:
     
     st.header("1. Upload All Photos")
     uploaded_files = st.file_uploader(
-        "Upload Photos (JPG/PNG)",
-        type=["jpg", "png", "jpeg"],
+        "Upload Photos (JPG/PNG) or Videos (MP4/MOV/AVI/MKV)",
+        type=["jpg", "png", "jpeg"] + VIDEO_TYPES,
         accept_multiple_files=True,
         key="all_photo_uploader"
     )
     
     if uploaded_files and st.session_state.current_session_id:
         if st.button("Save to Database", use_container_width=True, key="save_to_db_btn"):
-            with st.spinner("Saving photos to database..."):
+            st.session_state.save_errors = []
+            with st.spinner("Saving photos to database (videos are sampled into frames)..."):
                 saved_count = save_photos_to_db(st.session_state.current_session_id, uploaded_files)
             # Re-fetch from DB to get file objects that Streamlit likes for processing later
             st.session_state.comparison_files = get_photos_from_db(st.session_state.current_session_id) 
             st.success(f"{saved_count} photos saved to database!")
             st.session_state.shareable_link = generate_shareable_link(st.session_state.current_session_id)
             st.session_state.matched_photos = None # Reset results
+            st.session_state.stopped_capture = None # Allow a fresh search
             st.session_state.processed_files = set() # Reset processed files
             st.rerun()
     
@@ -268,6 +401,10 @@ with st.sidebar:
         count = c.fetchone()[0]
         st.caption(f"Stored in database: {count} photos")
     
+    # Files skipped during the last save
+    for error in st.session_state.save_errors:
+        st.warning(error)
+    
     
     # --- FIX: Sensitivity setting UNCOMMENTED ---
     st.markdown("---")
@@ -285,6 +422,15 @@ with st.sidebar:
     # Use anywhere in your code
     MATCH_THRESHOLD = st.session_state.MATCH_THRESHOLD
 
+    st.session_state.MAX_MATCHES = st.number_input(
+        "Stop after N matches (0 = check all photos)",
+        min_value=0,
+        value=st.session_state.MAX_MATCHES,
+        step=1,
+        help="Ends the search early once this many matching photos have been found.",
+        key="max_matches_input"
+    )
+
 
 # ---------------- MAIN INTERFACE ----------------
 
@@ -304,6 +450,7 @@ if not st.session_state.current_session_id:
             st.session_state.shareable_link = generate_shareable_link(new_session_id)
             st.session_state.session_loaded_from_url = False
             st.session_state.matched_photos = None # Reset results
+            st.session_state.stopped_capture = None # Allow a fresh search
             st.session_state.processed_files = set() # Reset processed files
             st.rerun()
     
@@ -325,6 +472,7 @@ else:
         
         if st.button("Activate Camera", use_container_width=True, type="primary", key="activate_camera_btn"):
             st.session_state.show_camera = True
+            st.session_state.stopped_capture = None # Allow a fresh search
         
         if st.session_state.show_camera:
             st.markdown("---")
@@ -358,16 +506,43 @@ else:
                             st.markdown("---")
                             st.header("4. Searching in Photos...")
                             
-                            with st.spinner(f"Searching for the face in {len(st.session_state.comparison_files)} photos..."):
-                                # Reset file pointers before processing
-                                for file in st.session_state.comparison_files:
-                                    file.seek(0)
-                                matched_photos = find_matching_photos(
-                                    st.session_state.target_person_encoding,
-                                    st.session_state.comparison_files
-                                )
+                            # Same capture, session and search settings -> same search
+                            capture_key = (
+                                f"{st.session_state.current_session_id}:"
+                                f"{st.session_state.MATCH_THRESHOLD}:"
+                                f"{st.session_state.MAX_MATCHES}:"
+                                f"{hashlib.md5(target_file_bytes).hexdigest()}"
+                            )
                             
-                            st.session_state.matched_photos = matched_photos
+                            if st.session_state.stopped_capture == capture_key:
+                                # Search was stopped by the user: keep partial results, don't restart it
+                                st.info("Search stopped. Showing the matches found so far.")
+                                st.button(
+                                    "Search Again",
+                                    key="resume_search_btn",
+                                    on_click=resume_search
+                                )
+                                matched_photos = None
+                            else:
+                                stop_placeholder = st.empty()
+                                stop_placeholder.button(
+                                    "Stop Search",
+                                    key="stop_search_btn",
+                                    on_click=stop_search,
+                                    args=(capture_key, target_file_bytes)
+                                )
+                                with st.spinner(f"Searching for the face in {len(st.session_state.comparison_files)} photos..."):
+                                    # Reset file pointers before processing
+                                    for file in st.session_state.comparison_files:
+                                        file.seek(0)
+                                    matched_photos = find_matching_photos(
+                                        st.session_state.target_person_encoding,
+                                        st.session_state.comparison_files,
+                                        st.session_state.MAX_MATCHES
+                                    )
+                                stop_placeholder.empty()
+                                
+                                st.session_state.matched_photos = matched_photos
                             
                             # Save results to database
                             if matched_photos:
@@ -378,6 +553,7 @@ else:
                                     st.session_state.target_person_name,
                                     matched_filenames
                                 )
+                                st.session_state.results_saved = True
                                 st.success(f"Results saved to database!")
                             
                         else:
@@ -393,9 +569,16 @@ if st.session_state.matched_photos is not None:
     st.markdown("---")
     st.header("5. Results")
     matched_photos = st.session_state.matched_photos
+    search_stats = st.session_state.search_stats
+    if search_stats:
+        photos_checked = search_stats["checked"]
+    else:
+        photos_checked = len(st.session_state.comparison_files)
     
     if matched_photos:
         st.success(f"Face found in **{len(matched_photos)} photos**")
+        if search_stats and search_stats["stopped_early"]:
+            st.caption(f"Search stopped early after checking {photos_checked} of {search_stats['total']} photos.")
         
         # Display results in tabs
         tab1, tab2 = st.tabs(["View Photos", "Statistics"])
@@ -408,6 +591,8 @@ if st.session_state.matched_photos is not None:
                     match['file'].seek(0)
                     st.image(match['file'], use_column_width=True)
                     st.caption(f"**{match['filename']}**")
+                    if match['video_time'] is not None:
+                        st.caption(f"Video: {match['source_video']} at {format_video_time(match['video_time'])}")
                     st.caption(f"Faces detected: {match['faces_detected']}")
         
         with tab2:
@@ -415,17 +600,20 @@ if st.session_state.matched_photos is not None:
             col1, col2, col3 = st.columns(3)
             
             with col1:
-                st.metric("Total Photos Checked", len(st.session_state.comparison_files))
+                st.metric("Total Photos Checked", photos_checked)
             
             with col2:
                 st.metric("Matches Found", len(matched_photos))
             
             with col3:
-                if len(st.session_state.comparison_files) > 0:
-                    percentage = (len(matched_photos) / len(st.session_state.comparison_files)) * 100
+                if photos_checked > 0:
+                    percentage = (len(matched_photos) / photos_checked) * 100
                     st.metric("Match Rate", f"{percentage:.1f}%")
                 else:
                     st.metric("Match Rate", "0%")
+            
+            if search_stats:
+                show_search_timing(search_stats)
         
         # --- Download Option ---
         st.markdown("---")
@@ -446,11 +634,18 @@ if st.session_state.matched_photos is not None:
                 )
             
             with col2:
-                # Option to save results to database
-                st.write("Results already saved to database.")
+                if st.session_state.results_saved:
+                    st.write("Results already saved to database.")
     
     else:
-        st.warning(f"No matches found in the photos. Try increasing the Matching Accuracy (Threshold) in the sidebar.")
+        if search_stats and search_stats["stopped_early"]:
+            st.warning(f"Search stopped early after checking {photos_checked} of {search_stats['total']} photos. No matches found so far.")
+        else:
+            st.warning(f"No matches found in the photos. Try increasing the Matching Accuracy (Threshold) in the sidebar.")
+        
+        if search_stats:
+            st.metric("Total Photos Checked", photos_checked)
+            show_search_timing(search_stats)
 
 # ---------------- SESSION HISTORY ----------------
 with st.sidebar:
@@ -491,6 +686,7 @@ with st.sidebar:
                             st.session_state.comparison_files = photos
                             st.session_state.shareable_link = generate_shareable_link(session_id)
                             st.session_state.matched_photos = None # Reset results
+                            st.session_state.stopped_capture = None # Allow a fresh search
                             st.session_state.processed_files = set() # Reset processed files
                             st.rerun()
             except Exception as e:
@@ -35,5 +35,14 @@ def init_db():
         )
     """)
 
+    # Video frames are stored as photos; these columns link them back to the clip.
+    # Added with ALTER TABLE so databases created before video support still work.
+    c.execute("PRAGMA table_info(photos)")
+    photo_columns = [row[1] for row in c.fetchall()]
+    if "source_video" not in photo_columns:
+        c.execute("ALTER TABLE photos ADD COLUMN source_video TEXT")
+    if "video_time" not in photo_columns:
+        c.execute("ALTER TABLE photos ADD COLUMN video_time REAL")
+
     conn.commit()
     return conn
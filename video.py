@@ -0,0 +1,138 @@
+import os
+import shutil
+import tempfile
+
+import cv2
+import numpy as np
+
+VIDEO_TYPES = ["mp4", "mov", "avi", "mkv"]
+
+# Frames are sampled at this rate before any comparison is done
+SAMPLE_FPS = 2
+# Minimum gap between two kept frames, so a shaky camera can't flood the session
+MIN_GAP_SECONDS = 2.0
+# Mean pixel difference (0-1) against the last kept frame that counts as a new view
+SCENE_CHANGE_THRESHOLD = 0.08
+# Below this difference from the previous sampled frame the camera is considered steady
+MOTION_THRESHOLD = 0.03
+# During sustained motion (a pan), keep at most one changed frame per this gap
+MAX_MOTION_GAP_SECONDS = 30.0
+# Hard cap per minute of video (5/min = at most 300 frames for a 1-hour clip)
+MAX_FRAMES_PER_MINUTE = 5
+# Small grayscale thumbnail used for the comparison
+COMPARE_SIZE = (64, 36)
+JPEG_QUALITY = 90
+
+
+def is_video_file(filename):
+    """Check the file extension against the supported video types"""
+    return filename.rsplit(".", 1)[-1].lower() in VIDEO_TYPES
+
+
+def format_video_time(seconds):
+    """Format a time offset in seconds as HH:MM:SS"""
+    seconds = int(seconds)
+    return f"{seconds // 3600:02d}:{(seconds % 3600) // 60:02d}:{seconds % 60:02d}"
+
+
+def _compare_thumbnail(frame):
+    """Shrink a frame to a blurred grayscale thumbnail for scene comparison"""
+    gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+    small = cv2.resize(gray, COMPARE_SIZE, interpolation=cv2.INTER_AREA)
+    return cv2.GaussianBlur(small, (3, 3), 0)
+
+
+def extract_video_frames(video_file):
+    """
+    Yield (filename, jpeg_bytes, seconds) for the frames worth searching in a video.
+
+    Streamlit already holds the whole upload in memory; it is written to a temporary
+    file only because cv2.VideoCapture needs a path. Every frame is still decoded
+    (grab() decodes with the FFmpeg backend), but only SAMPLE_FPS frames per second
+    are converted and compared, and decoded frames are never all in memory at once.
+
+    A sampled frame is kept when it differs from the last kept frame and is either a
+    hard cut, a steady view after camera motion, or MAX_MOTION_GAP_SECONDS into a
+    sustained pan. At most MAX_FRAMES_PER_MINUTE frames are kept per minute of video.
+    """
+    video_file.seek(0)
+    extension = os.path.splitext(video_file.name)[1]
+    tmp = tempfile.NamedTemporaryFile(suffix=extension, delete=False)
+    tmp_path = tmp.name
+    cap = None
+    try:
+        with tmp:
+            shutil.copyfileobj(video_file, tmp, 1024 * 1024)
+
+        cap = cv2.VideoCapture(tmp_path)
+        if not cap.isOpened():
+            raise ValueError(f"Could not open video {video_file.name}")
+
+        fps = cap.get(cv2.CAP_PROP_FPS)
+        if not (0 < fps < 1000):
+            # Missing, NaN or nonsense FPS in the container metadata
+            fps = 25.0
+        step = max(1, round(fps / SAMPLE_FPS))
+
+        last_thumbnail = None
+        previous_thumbnail = None
+        last_kept_time = None
+        kept_per_minute = {}
+        frame_index = -1
+
+        while True:
+            # grab() decodes the frame; retrieve() only converts the sampled ones
+            if not cap.grab():
+                break
+            frame_index += 1
+            if frame_index % step:
+                continue
+
+            ok, frame = cap.retrieve()
+            if not ok:
+                continue
+
+            # Container timestamp handles variable-frame-rate footage
+            seconds = cap.get(cv2.CAP_PROP_POS_MSEC) / 1000.0
+            if not seconds > 0:
+                seconds = frame_index / fps
+
+            thumbnail = _compare_thumbnail(frame)
+            if previous_thumbnail is not None:
+                motion = np.mean(cv2.absdiff(thumbnail, previous_thumbnail)) / 255.0
+            else:
+                motion = 0.0
+            previous_thumbnail = thumbnail
+
+            if last_thumbnail is not None:
+                if seconds - last_kept_time < MIN_GAP_SECONDS:
+                    continue
+
+                difference = np.mean(cv2.absdiff(thumbnail, last_thumbnail)) / 255.0
+                if difference < SCENE_CHANGE_THRESHOLD:
+                    # Near-identical to the last kept frame
+                    continue
+
+                is_cut = motion >= SCENE_CHANGE_THRESHOLD
+                is_steady = motion < MOTION_THRESHOLD
+                if not (is_cut or is_steady or seconds - last_kept_time >= MAX_MOTION_GAP_SECONDS):
+                    # Mid-pan: wait for the camera to settle
+                    continue
+
+            minute = int(seconds // 60)
+            if kept_per_minute.get(minute, 0) >= MAX_FRAMES_PER_MINUTE:
+                continue
+
+            ok, encoded = cv2.imencode(".jpg", frame, [cv2.IMWRITE_JPEG_QUALITY, JPEG_QUALITY])
+            if not ok:
+                continue
+
+            last_thumbnail = thumbnail
+            last_kept_time = seconds
+            kept_per_minute[minute] = kept_per_minute.get(minute, 0) + 1
+            filename = f"{video_file.name}@{format_video_time(seconds).replace(':', '-')}.jpg"
+            yield filename, encoded.tobytes(), seconds
+    finally:
+        if cap is not None:
+            cap.release()
+        os.remove(tmp_path)